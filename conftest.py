@@ -0,0 +1,65 @@
+"""
+Test configuration
+
+This file lives in the project root so pytest puts the root on sys.path and
+tests import the bot's modules (leaderboard, outbox, ...) the same way the
+modules import each other.
+
+Database tests run against TEST_DATABASE_URL, a PostgreSQL database that is
+emptied before each of them, and are skipped when it is not set.
+"""
+
+import os
+import asyncio
+import pytest
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+if TEST_DATABASE_URL:
+    # database.py builds its engines from DATABASE_URL when it is first imported
+    os.environ['DATABASE_URL'] = TEST_DATABASE_URL
+    os.environ.pop('ASYNC_DATABASE_URL', None)
+
+# Truncated before every database test; blood centers, events and info sections seeded by init_db stay
+DATA_TABLES = ['users', 'outbox_messages', 'excel_change_log', 'imported_rows', 'imported_files',
+               'export_manifests', 'broadcasts', 'faq_entries']
+
+@pytest.fixture(scope='session')
+def database():
+    """Schema and seed data from init_db"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from database import init_db
+    init_db()
+
+@pytest.fixture
+def db(database):
+    """An empty donor base"""
+    from sqlalchemy import text
+    from database import engine
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {', '.join(DATA_TABLES)} RESTART IDENTITY CASCADE"))
+
+@pytest.fixture
+def session(db):
+    """A sync session that is rolled back after the test"""
+    from database import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+@pytest.fixture
+def run_async(db):
+    """Run a coroutine on a fresh event loop; the async pool is disposed with the loop"""
+    from database import async_engine
+    
+    def run(coroutine):
+        async def main():
+            try:
+                return await coroutine
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(main())
+    return run
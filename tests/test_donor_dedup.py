@@ -0,0 +1,86 @@
+"""
+Tests for duplicate donor detection and merging
+"""
+
+from datetime import datetime
+from sqlalchemy import select
+from database import get_db
+from donor_dedup import deduplicate_donors, donor_record, find_duplicates
+from models import BloodCenter, Donation, DonorStats, User
+
+def test_same_phone_with_a_name_typo_is_one_donor():
+    clusters, report = find_duplicates([
+        donor_record(1, 'Иванов Иван Иванович', '79990000001', 'Б21-001', -1, False),
+        donor_record(2, 'Иванов Иван Иваныч', '+7 999 000-00-01', None, 555, False),
+        donor_record(3, 'Петров Пётр Петрович', '79990000002', 'Б21-001', -2, False)
+    ])
+    
+    assert len(clusters) == 1
+    # The donor who opened the bot survives over the imported record
+    assert (clusters[0]['keep'], clusters[0]['drop'], clusters[0]['conflict']) == (2, [1], False)
+    assert (report['duplicates'], report['conflicts']) == (1, 0)
+
+def test_same_name_needs_the_same_group():
+    records = [
+        donor_record(1, 'Сидорова Анна Сергеевна', '79990000001', 'Б21-001', -1, False),
+        donor_record(2, 'Сидорова Анна Сергеевна', '79990000002', 'б21-001 ', -2, False),
+        donor_record(3, 'Сидорова Анна Сергеевна', '79990000003', 'Б22-005', -3, False)
+    ]
+    clusters, _ = find_duplicates(records)
+    
+    assert [(cluster['keep'], cluster['drop']) for cluster in clusters] == [(1, [2])]
+    assert clusters[0]['matches'][0][3] == 'name+group'
+
+def test_same_phone_with_a_different_name_is_not_merged():
+    clusters, _ = find_duplicates([
+        donor_record(1, 'Иванов Иван Иванович', '79990000001', None, -1, False),
+        donor_record(2, 'Смирнова Ольга Павловна', '79990000001', None, -2, False)
+    ])
+    
+    assert clusters == []
+
+def test_admin_survives_and_two_telegram_accounts_conflict():
+    clusters, report = find_duplicates([
+        donor_record(1, 'Иванов Иван Иванович', '79990000001', None, 111, False),
+        donor_record(2, 'Иванов Иван Иванович', '89990000001', None, 222, True)
+    ])
+    
+    assert (clusters[0]['keep'], clusters[0]['conflict']) == (2, True)
+    assert (report['duplicates'], report['conflicts']) == (0, 1)
+
+def add_donor(session, telegram_id, full_name, phone, donations=0):
+    user = User(telegram_id=telegram_id, phone_number=phone, full_name=full_name,
+                user_type='student', group_number='Б21-001', consent_given=True)
+    session.add(user)
+    session.flush()
+    center_id = session.scalar(select(BloodCenter.id).where(BloodCenter.short_name == 'ЦК ФМБА'))
+    for _ in range(donations):
+        session.add(Donation(user_id=user.id, event_id=1, blood_center_id=center_id, donation_date=datetime.now()))
+    return user.id
+
+def test_merge_moves_donations_to_the_survivor(db):
+    with get_db() as session:
+        imported = add_donor(session, -1, 'Иванов Иван Иванович', '79990000001', donations=2)
+        registered = add_donor(session, 555, 'Иванов Иван Иваныч', '+79990000001', donations=1)
+        other = add_donor(session, -2, 'Петров Пётр Петрович', '79990000002', donations=1)
+    
+    clusters, report = deduplicate_donors()
+    assert report['merged'] == 0
+    assert [(cluster['keep'], cluster['drop']) for cluster in clusters] == [(registered, [imported])]
+    
+    _, report = deduplicate_donors(merge=True)
+    assert report['merged'] == 1
+    with get_db() as session:
+        assert session.scalars(select(User.id).order_by(User.id)).all() == [registered, other]
+        assert session.scalars(select(Donation.user_id).order_by(Donation.user_id)).all() == [registered] * 3 + [other]
+        assert session.scalar(select(DonorStats.total_donations).where(DonorStats.user_id == registered)) == 3
+
+def test_conflicting_accounts_are_left_alone(db):
+    with get_db() as session:
+        add_donor(session, 111, 'Иванов Иван Иванович', '79990000001', donations=1)
+        add_donor(session, 222, 'Иванов Иван Иванович', '+79990000001', donations=1)
+    
+    _, report = deduplicate_donors(merge=True)
+    assert (report['conflicts'], report['merged']) == (1, 0)
+    with get_db() as session:
+        assert len(session.scalars(select(User.id)).all()) == 2
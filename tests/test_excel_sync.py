@@ -0,0 +1,76 @@
+"""
+Tests for the Excel change log and its compaction into a fresh export
+"""
+
+import pytest
+from sqlalchemy import func, select
+import excel_sync
+from database import engine, get_db
+from excel_sync import EXCEL_COMPACTION_LOCK, compact_excel_changes, record_excel_change
+from models import ExcelChangeLog, User
+
+@pytest.fixture
+def donor(db, tmp_path, monkeypatch):
+    # Exports are written to the working directory
+    monkeypatch.chdir(tmp_path)
+    with get_db() as session:
+        user = User(telegram_id=555, phone_number='+79990000001', full_name='Иванов Иван Иванович',
+                    user_type='student', group_number='Б21-001', consent_given=True)
+        session.add(user)
+        session.flush()
+        return user.id
+
+def log_change(user_id, change='donation'):
+    with get_db() as session:
+        entry = ExcelChangeLog(user_id=user_id, change=change)
+        session.add(entry)
+        session.flush()
+        return entry.id
+
+def pending_changes():
+    with get_db() as session:
+        return session.scalars(select(ExcelChangeLog.id).order_by(ExcelChangeLog.id)).all()
+
+def test_compaction_exports_and_drains_the_log(donor, tmp_path):
+    with get_db() as session:
+        record_excel_change(session, donor, 'donor_added')
+        record_excel_change(session, donor, 'donation', {'blood_center_id': 1})
+    
+    filename, count, changes = compact_excel_changes()
+    assert (count, changes) == (1, 2)
+    assert (tmp_path / filename).exists()
+    assert pending_changes() == []
+
+def test_empty_log_writes_nothing(donor, tmp_path):
+    assert compact_excel_changes() is None
+    assert list(tmp_path.iterdir()) == []
+
+def test_change_committed_during_the_export_is_kept(donor, monkeypatch):
+    exported = log_change(donor)
+    late = []
+    write_donor_export = excel_sync.write_donor_export
+    
+    def export_while_a_donation_commits(session):
+        late.append(log_change(donor))
+        return write_donor_export(session)
+    
+    monkeypatch.setattr(excel_sync, 'write_donor_export', export_while_a_donation_commits)
+    _, _, changes = compact_excel_changes()
+    
+    assert changes == 1
+    assert pending_changes() == late
+    assert late[0] > exported
+    
+    # The next run picks it up
+    monkeypatch.setattr(excel_sync, 'write_donor_export', write_donor_export)
+    assert compact_excel_changes()[2] == 1
+    assert pending_changes() == []
+
+def test_compaction_running_elsewhere_is_skipped(donor):
+    entry = log_change(donor)
+    with engine.connect() as connection:
+        with connection.begin():
+            connection.execute(select(func.pg_advisory_xact_lock(EXCEL_COMPACTION_LOCK)))
+            assert compact_excel_changes() is None
+    
+    assert pending_changes() == [entry]
@@ -0,0 +1,125 @@
+"""
+Tests for the incremental donor sheet import
+"""
+
+from datetime import datetime
+from sqlalchemy import func, select
+from database import get_db
+from donor_stats import rebuild_donor_stats
+from import_data import import_donor_rows, is_temporary_telegram_id
+from models import BloodCenter, Donation, User
+
+def sheet_row(name, phone, gavrilov=0, fmba=0, group='Б21-001'):
+    return {'ФИО': name, 'Группа': group, 'Телефон': phone, 'Кол-во Гаврилова': gavrilov, 'Кол-во ФМБА': fmba}
+
+SHEET = [
+    sheet_row('Иванов Иван Иванович', 79990000001, gavrilov=2),
+    sheet_row('Петров Пётр Петрович', 79990000002, fmba=1),
+    sheet_row('Сидорова Анна Сергеевна', 79990000003, gavrilov=1, fmba=1)
+]
+
+def run_import(rows, dry_run=False):
+    with get_db() as session:
+        report, _ = import_donor_rows(session, enumerate(rows), dry_run=dry_run)
+        if dry_run:
+            session.rollback()
+        return report
+
+def donations_by_center(phone):
+    with get_db() as session:
+        return dict(session.execute(
+            select(BloodCenter.short_name, func.count())
+            .join(Donation.blood_center).join(Donation.user)
+            .where(User.phone_number == str(phone))
+            .group_by(BloodCenter.short_name)
+        ).all())
+
+def test_new_rows_are_inserted_with_donations_per_center(db):
+    report = run_import(SHEET)
+    
+    assert (report['inserted'], report['donations_added']) == (3, 5)
+    assert donations_by_center(79990000001) == {'ЦК Гаврилова': 2}
+    assert donations_by_center(79990000002) == {'ЦК ФМБА': 1}
+    with get_db() as session:
+        telegram_ids = session.scalars(select(User.telegram_id)).all()
+    assert len(set(telegram_ids)) == 3
+    assert all(is_temporary_telegram_id(telegram_id) for telegram_id in telegram_ids)
+
+def test_reimporting_the_same_sheet_changes_nothing(db):
+    run_import(SHEET)
+    report = run_import(SHEET)
+    
+    assert report['unchanged'] == 3
+    assert (report['inserted'], report['updated'], report['donations_added']) == (0, 0, 0)
+    assert donations_by_center(79990000003) == {'ЦК Гаврилова': 1, 'ЦК ФМБА': 1}
+
+def test_row_inserted_mid_sheet_only_adds_that_donor(db):
+    run_import(SHEET)
+    report = run_import(SHEET[:1] + [sheet_row('Кузнецов Олег Игоревич', 79990000004, fmba=3)] + SHEET[1:])
+    
+    assert (report['inserted'], report['unchanged'], report['updated']) == (1, 3, 0)
+    assert donations_by_center(79990000004) == {'ЦК ФМБА': 3}
+    with get_db() as session:
+        telegram_ids = session.scalars(select(User.telegram_id)).all()
+    assert len(set(telegram_ids)) == 4
+
+def gavrilov_center(session):
+    return session.scalar(select(BloodCenter.id).where(BloodCenter.short_name == 'ЦК Гаврилова'))
+
+def test_lower_count_removes_imported_donations_only(db):
+    run_import(SHEET)
+    with get_db() as session:
+        user_id = session.scalar(select(User.id).where(User.phone_number == '79990000001'))
+        session.add(Donation(user_id=user_id, event_id=1, blood_center_id=gavrilov_center(session),
+                             donation_date=datetime.now(), imported=False))
+    
+    report = run_import([sheet_row('Иванов Иван Иванович', 79990000001, gavrilov=1)] + SHEET[1:])
+    assert (report['updated'], report['donations_removed'], report['conflicts']) == (1, 1, 0)
+    
+    report = run_import([sheet_row('Иванов Иван Иванович', 79990000001)] + SHEET[1:])
+    assert (report['donations_removed'], report['conflicts']) == (1, 0)
+    with get_db() as session:
+        remaining = session.scalars(select(Donation.imported).where(Donation.user_id == user_id)).all()
+    assert remaining == [False]
+
+def test_drop_below_bot_recorded_donations_is_a_conflict(db):
+    # A donor registered through the bot, then adopted by the sheet with matching counts
+    with get_db() as session:
+        user = User(telegram_id=555, phone_number='79990000001', full_name='Иванов Иван Иванович',
+                    user_type='student', group_number='Б21-001', consent_given=True)
+        session.add(user)
+        session.flush()
+        user_id = user.id
+        session.add(Donation(user_id=user_id, event_id=1, blood_center_id=gavrilov_center(session),
+                             donation_date=datetime.now()))
+    rebuild_donor_stats([user_id])
+    report = run_import([sheet_row('Иванов Иван Иванович', 79990000001, gavrilov=1)])
+    assert (report['inserted'], report['updated'], report['donations_added']) == (0, 1, 0)
+    
+    report = run_import([sheet_row('Иванов Иван Иванович', 79990000001)])
+    assert (report['donations_removed'], report['conflicts']) == (0, 1)
+    assert donations_by_center(79990000001) == {'ЦК Гаврилова': 1}
+
+def test_changed_name_updates_the_donor(db):
+    run_import(SHEET)
+    report = run_import([sheet_row('Иванов Иван Иванович', 79990000001, gavrilov=2, group='Б22-005')] + SHEET[1:])
+    
+    assert (report['updated'], report['donations_added'], report['donations_removed']) == (1, 0, 0)
+    with get_db() as session:
+        assert session.scalar(select(User.group_number).where(User.phone_number == '79990000001')) == 'Б22-005'
+
+def test_rows_without_name_or_phone_and_repeats_are_skipped(db):
+    report = run_import(SHEET + [
+        sheet_row(None, 79990000005),
+        sheet_row('Без Телефона', None, gavrilov=1),
+        sheet_row('Иванов Иван Иванович', 79990000001, gavrilov=2)
+    ])
+    
+    assert (report['inserted'], report['no_name'], report['no_phone'], report['duplicate']) == (3, 1, 1, 1)
+
+def test_dry_run_reports_without_writing(db):
+    report = run_import(SHEET, dry_run=True)
+    
+    assert (report['inserted'], report['donations_added'], report['dry_run']) == (3, 5, True)
+    with get_db() as session:
+        assert session.scalar(select(func.count()).select_from(User)) == 0
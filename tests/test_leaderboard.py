@@ -0,0 +1,59 @@
+"""
+Tests for the incrementally maintained donor leaderboard
+"""
+
+from leaderboard import Leaderboard
+
+STUDENTS = ('user_type', 'student')
+
+def make_board():
+    board = Leaderboard()
+    board.update(1, 5, 'Иванов Иван', 'student', 'Б21-001')
+    board.update(2, 3, 'Петров Пётр', 'student', 'Б21-002')
+    board.update(3, 5, 'Сидоров Сидор', 'employee')
+    board.update(4, 1, 'Козлов Козьма', 'external')
+    return board
+
+def test_rank_counts_donors_with_more_donations():
+    assert make_board().rank(2) == (3, 4, 75.0)
+
+def test_equal_counts_share_a_rank():
+    board = make_board()
+    assert board.rank(1)[0] == board.rank(3)[0] == 1
+
+def test_rank_within_a_partition():
+    board = make_board()
+    assert board.rank(1, STUDENTS) == (1, 2, 50.0)
+    assert board.rank(2, STUDENTS) == (2, 2, 100.0)
+
+def test_donor_outside_a_partition_has_no_rank():
+    board = make_board()
+    assert board.rank(3, STUDENTS) is None
+    # Donor 1 has more donations than anyone in Б21-002 but is not in that group
+    assert board.rank(1, ('group_number', 'Б21-002')) is None
+    assert board.rank(1, ('group_number', 'Б21-999')) is None
+
+def test_update_moves_a_donor():
+    board = make_board()
+    board.update(4, 6, 'Козлов Козьма', 'external')
+    assert board.rank(4) == (1, 4, 25.0)
+    assert board.rank(1) == (2, 4, 50.0)
+    assert board.rank(4, ('user_type', 'external')) == (1, 1, 100.0)
+
+def test_update_moves_a_donor_between_partitions():
+    board = make_board()
+    board.update(2, 3, 'Петров Пётр', 'student', 'Б21-001')
+    assert board.rank(2, ('group_number', 'Б21-002')) is None
+    assert board.rank(2, ('group_number', 'Б21-001')) == (2, 2, 100.0)
+
+def test_donor_without_donations_is_not_ranked():
+    board = make_board()
+    board.update(5, 0, 'Новиков Новик', 'student')
+    board.update(4, 0, 'Козлов Козьма', 'external')
+    assert board.rank(5) is None
+    assert board.rank(4) is None
+    assert [user_id for user_id, *_ in board.top()] == [1, 3, 2]
+
+def test_top_lists_donors_by_donations():
+    assert make_board().top(2) == [(1, 'Иванов Иван', 'student', 5), (3, 'Сидоров Сидор', 'employee', 5)]
+    assert make_board().top(partition=STUDENTS) == [(1, 'Иванов Иван', 'student', 5), (2, 'Петров Пётр', 'student', 3)]
@@ -0,0 +1,113 @@
+"""
+Tests for outbox delivery, retries with backoff and dead-lettering
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select, update
+from telegram.error import Forbidden, NetworkError, RetryAfter
+import broadcast
+import outbox
+from broadcast import RateLimiter
+from database import get_db
+from models import OutboxMessage
+from outbox import OutboxDispatcher, enqueue_message
+
+class FakeBot:
+    """Records sent messages; raises the given errors, in order, first"""
+    
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.sent = []
+    
+    async def send_message(self, chat_id, text, parse_mode=None):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text))
+
+@pytest.fixture(autouse=True)
+def limiter(monkeypatch):
+    # A limiter for this test's event loop, without per-chat spacing
+    monkeypatch.setattr(broadcast, 'limiter', RateLimiter(chat_interval=0))
+
+def queue_message(chat_id=100, text='Ответ на ваш вопрос'):
+    with get_db() as session:
+        enqueue_message(session, chat_id, text)
+
+def stored_message():
+    with get_db() as session:
+        return session.execute(
+            select(OutboxMessage.status, OutboxMessage.attempts, OutboxMessage.last_error,
+                   OutboxMessage.next_attempt_at)
+        ).one()
+
+def make_due():
+    with get_db() as session:
+        session.execute(update(OutboxMessage).values(next_attempt_at=datetime.utcnow()))
+
+def test_message_is_sent_once(run_async):
+    queue_message()
+    bot = FakeBot()
+    dispatcher = OutboxDispatcher(bot)
+    
+    assert run_async(dispatcher.dispatch_batch()) == 1
+    assert bot.sent == [(100, 'Ответ на ваш вопрос')]
+    assert stored_message()[:2] == ('sent', 1)
+    assert run_async(dispatcher.dispatch_batch()) == 0
+
+def test_message_is_queued_only_if_the_transaction_commits(run_async):
+    with pytest.raises(RuntimeError):
+        with get_db() as session:
+            enqueue_message(session, 100, 'Не отправится')
+            raise RuntimeError("handler failed")
+    
+    assert run_async(OutboxDispatcher(FakeBot()).dispatch_batch()) == 0
+
+def test_transient_error_is_retried_after_backoff(run_async, monkeypatch):
+    monkeypatch.setattr(outbox, 'backoff_delay', lambda attempts: 60)
+    queue_message()
+    bot = FakeBot(NetworkError("Timed out"))
+    dispatcher = OutboxDispatcher(bot)
+    
+    started = datetime.utcnow()
+    run_async(dispatcher.dispatch_batch())
+    status, attempts, last_error, next_attempt_at = stored_message()
+    assert (status, attempts, last_error) == ('pending', 1, 'Timed out')
+    assert next_attempt_at >= started + timedelta(seconds=60)
+    
+    # Not due until the backoff has passed
+    assert run_async(dispatcher.dispatch_batch()) == 0
+    
+    make_due()
+    run_async(dispatcher.dispatch_batch())
+    assert stored_message()[:3] == ('sent', 2, None)
+    assert bot.sent == [(100, 'Ответ на ваш вопрос')]
+
+def test_message_is_dead_lettered_when_retries_run_out(run_async):
+    queue_message()
+    bot = FakeBot(*(NetworkError(f"Attempt {attempt} failed") for attempt in range(1, 4)))
+    dispatcher = OutboxDispatcher(bot, max_attempts=3)
+    
+    for _ in range(3):
+        make_due()
+        assert run_async(dispatcher.dispatch_batch()) == 1
+    
+    assert stored_message()[:3] == ('dead', 3, 'Attempt 3 failed')
+    make_due()
+    assert run_async(dispatcher.dispatch_batch()) == 0
+    assert bot.sent == []
+
+def test_permanent_error_is_dead_lettered_at_once(run_async):
+    queue_message()
+    run_async(OutboxDispatcher(FakeBot(Forbidden("Forbidden: bot was blocked by the user"))).dispatch_batch())
+    
+    assert stored_message()[:3] == ('dead', 1, 'Forbidden: bot was blocked by the user')
+
+def test_flood_control_does_not_use_up_an_attempt(run_async):
+    queue_message()
+    started = datetime.utcnow()
+    run_async(OutboxDispatcher(FakeBot(RetryAfter(30))).dispatch_batch())
+    
+    status, attempts, _, next_attempt_at = stored_message()
+    assert (status, attempts) == ('pending', 0)
+    assert next_attempt_at >= started + timedelta(seconds=30)